@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
 import logging
+import math
 import random
-from typing import Iterable
+from collections import deque
+from typing import Any, Iterable, List, Tuple
 
 from midifx.constants import MAX_QUEUE_SIZE
 from midifx.note import Message, ControlChange
@@ -13,33 +16,163 @@ class Module:
     def __init__(self, name: str, on: bool | Switch = True):
         self.name = name
         self.on = as_parameter(on)
-        self.input = asyncio.PriorityQueue(maxsize=MAX_QUEUE_SIZE)
+        self.input = MessageQueue(maxsize=MAX_QUEUE_SIZE)
         self.outputs = []
+        self.fused = []  # downstream modules that are run inline in `send`
         self.tasks = [self.run]
 
     async def run(self) -> None:
         while True:
-            _, message = await self.input.get()
-            logging.debug(f"Incoming message on {self.name}: {message}")
+            messages = await self.input.get_batch()
+            await self.send(self.receive(messages))
+
+    def receive(self, messages: Iterable[Message]) -> Iterable[Message]:
+        """Handle a batch of incoming messages. The batch is split at each control change,
+        which is applied before processing the messages from the control change onwards.
+        """
+        processed = []
+        batch = []
+        for message in messages:
+            logging.debug("Incoming message on %s: %s", self.name, message)
             if isinstance(message, ControlChange):
+                if batch:
+                    processed.extend(self.process(batch) if self.on.value else batch)
+                    batch = []
                 self.control_change(message.number, message.value)
-            messages = self.process([message]) if self.on.value else [message]
-            await self.send(messages)
+            batch.append(message)
+        batch = self.process(batch) if self.on.value else batch
+        if not processed:
+            return batch
+        processed.extend(batch)
+        return processed
 
     async def send(self, messages: Iterable[Message]) -> None:
+        """Pass a batch of messages through any fused modules and queue the result on all
+        outputs, then wait for any full outputs to drain
+        """
+        for module in self.fused:
+            messages = module.receive(messages)
         for message in messages:
             if self.outputs:
-                logging.debug(f"Queuing message from {self.name}: {message}")
+                logging.debug("Queuing message from %s: %s", self.name, message)
             for queue in self.outputs:
-                await queue.put((message.start, message))
+                queue.put_nowait(message)
+        for queue in self.outputs:
+            if queue is self.input:
+                # a fused feedback loop can't wait for itself to drain, but should still let
+                # other tasks run (and the chain be interrupted) once per batch
+                await asyncio.sleep(0)
+            else:
+                await queue.drain()
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
+        """Apply the module's effect. `messages` is a tuple or list, so effects can modify
+        the messages in place and return the same collection.
+        """
         return messages
 
     def control_change(self, number: int, value: int) -> None:
-        for var in vars(self).values():
-            if isinstance(var, Parameter):
-                var.control_change(number, value)
+        for parameter in self._parameters.values():
+            if parameter.control_number == number:
+                parameter.control_change(number, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Keep track of `Parameter` attributes in `_parameters`, so control changes don't
+        need to look through all of the module's attributes. The dict is created on first use,
+        so subclasses can assign parameters before calling `super().__init__()`.
+        """
+        super().__setattr__(name, value)
+        parameters = self.__dict__.setdefault("_parameters", {})  # attribute name -> Parameter
+        if isinstance(value, Parameter):
+            parameters[name] = value
+        elif name in parameters:
+            del parameters[name]
+
+
+class MessageQueue:
+    """First-in, first-out queue connecting the modules in a chain.
+
+    A light-weight alternative to `asyncio.Queue` for the single-producer, single-consumer
+    connections between modules: items are kept in a `deque`, and two `asyncio.Event`s
+    signal when the queue is no longer empty and when it is no longer full.
+    """
+
+    def __init__(self, maxsize: int = MAX_QUEUE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._items = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def put_nowait(self, message: Message) -> None:
+        self._items.append(message)
+        self._not_empty.set()
+        if len(self._items) >= self.maxsize:
+            self._not_full.clear()
+
+    async def drain(self) -> None:
+        """Wait until the queue is below `maxsize`. Returns without suspending if it is"""
+        await self._not_full.wait()
+
+    async def get_batch(self) -> List[Message]:
+        """Wait for at least one message, then remove and return all queued messages"""
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        messages = list(self._items)
+        self._items.clear()
+        self._not_full.set()
+        return messages
+
+
+class TimedHeap:
+    """Priority queue of `(time, event)` pairs, e.g. MIDI events scheduled for sending.
+
+    Like `MessageQueue`, a light-weight alternative to `asyncio.PriorityQueue`: a `heapq` list
+    and an `asyncio.Event` that is set whenever an event is added. Unlike a queue, the earliest
+    event can be inspected with `peek` before it is due, without taking it off the heap.
+    """
+
+    def __init__(self, maxsize: int = MAX_QUEUE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._heap = []
+        self._added = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def put_nowait(self, item: Tuple[float, Any]) -> None:
+        heapq.heappush(self._heap, item)
+        self._added.set()
+        if len(self._heap) >= self.maxsize:
+            self._not_full.clear()
+
+    async def drain(self) -> None:
+        """Wait until the heap is below `maxsize`. Returns without suspending if it is"""
+        await self._not_full.wait()
+
+    def peek(self) -> Tuple[float, Any]:
+        return self._heap[0]
+
+    def pop(self) -> Tuple[float, Any]:
+        item = heapq.heappop(self._heap)
+        if len(self._heap) < self.maxsize:
+            self._not_full.set()
+        return item
+
+    async def wait(self, timeout: float | None = None) -> None:
+        """Wait until a new event is added, or until `timeout` seconds have passed"""
+        self._added.clear()
+        if timeout is None:
+            await self._added.wait()
+            return
+        handle = asyncio.get_running_loop().call_later(timeout, self._added.set)
+        try:
+            await self._added.wait()
+        finally:
+            handle.cancel()
 
 
 class Parameter:
@@ -103,7 +236,7 @@ class RandomParameter(Parameter):
     def control_change(self, number: int, value: int) -> None:
         if number != self.control_number or value == 0:
             return
-        value = random.randint(0, 128)
+        value = int(random.random() * 129)  # uniform in [0, 128], like randint(0, 128)
         super().control_change(number, value)
 
 
@@ -124,7 +257,7 @@ class ExponentialRandomParameter(Parameter):
     def control_change(self, number: int, value: int) -> None:
         if number != self.control_number or value == 0:
             return
-        new_value = random.expovariate(0.693 / self.median)
+        new_value = -math.log(1.0 - random.random()) * self.median / 0.693  # expovariate
         new_value = min(new_value, self.minimum + self.range)
         new_value = max(new_value, self.minimum)
         logging.info(f"Updating parameter '{self.name}' from {self.value:.3g} to {new_value:.3g}")
@@ -1,5 +1,7 @@
 import logging
 import random
+from collections import deque
+from itertools import islice
 from typing import Iterable
 
 from midifx.core import as_parameter, Module, Parameter, Switch
@@ -16,9 +18,10 @@ class Delay(Module):
         self.delay = as_parameter(delay)
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
+        delay = self.delay.value
         for message in messages:
-            message.start += self.delay.value
-            yield message
+            message.start += delay
+        return messages
 
 
 class Mirror(Module):
@@ -29,10 +32,11 @@ class Mirror(Module):
         self.center_pitch = Parameter(center_pitch, minimum=57, maximum=81, name="center_pitch")
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
+        center = 2 * int(round(self.center_pitch.value))
         for message in messages:
             if isinstance(message, Note):
-                message.pitch = clip_pitch(2 * int(round(self.center_pitch.value)) - message.pitch)
-            yield message
+                message.pitch = clip_pitch(center - message.pitch)
+        return messages
 
 
 class PitchShift(Module):
@@ -43,10 +47,11 @@ class PitchShift(Module):
         self.amount = as_parameter(amount)
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
+        amount = int(round(self.amount.value))
         for message in messages:
             if isinstance(message, Note):
-                message.pitch = clip_pitch(message.pitch + int(round(self.amount.value)))
-            yield message
+                message.pitch = clip_pitch(message.pitch + amount)
+        return messages
 
 
 class VelocityShift(Module):
@@ -60,13 +65,14 @@ class VelocityShift(Module):
         self.amount = as_parameter(amount)
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
+        amount = self.amount.value
         for message in messages:
             if isinstance(message, Note):
-                if self.amount.value > 0:
-                    message.velocity += int(self.amount.value * (128 - message.velocity))
+                if amount > 0:
+                    message.velocity += int(amount * (128 - message.velocity))
                 else:
-                    message.velocity += int(self.amount.value * message.velocity)
-            yield message
+                    message.velocity += int(amount * message.velocity)
+        return messages
 
 
 class Dropout(Module):
@@ -77,9 +83,12 @@ class Dropout(Module):
         self.amount = as_parameter(amount)
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
-        for message in messages:
-            if not isinstance(message, Note) or random.random() > self.amount.value:
-                yield message
+        amount = self.amount.value
+        return [
+            message
+            for message in messages
+            if not isinstance(message, Note) or random.random() > amount
+        ]
 
 
 class BufferDelay(Module):
@@ -89,34 +98,39 @@ class BufferDelay(Module):
 
     def __init__(self, control_message: ControlChange, gap: float | Parameter = 0.0) -> None:
         super().__init__("Buffer delay")
-        self.buffer = []
+        self.buffer = deque()
         self.control_message = control_message
         self.gap = as_parameter(gap)
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
+        flushed = []
         for message in messages:
-            if self.buffer and message.start < self.buffer[-1].start:
-                logging.warn("Buffer encountered message with non-monotonic start time")
             self.buffer.append(message)
             if (
                 isinstance(message, ControlChange)
                 and message.number == self.control_message.number
                 and message.value == self.control_message.value
             ):
-                yield from self.flush(message.start)
-
-    def flush(self, start: float):
-        logging.debug(f"Emptying buffer of length {len(self.buffer)}...")
-        delay = start - self.buffer[0].start + self.gap.value
-        for message in self.buffer:
+                flushed.extend(self.flush(message.start))
+        return flushed
+
+    def flush(self, start: float) -> Iterable[Message]:
+        buffer, self.buffer = self.buffer, deque()
+        logging.debug(f"Emptying buffer of length {len(buffer)}...")
+        if any(b.start < a.start for a, b in zip(buffer, islice(buffer, 1, None))):
+            logging.warning("Buffer encountered message with non-monotonic start time")
+        delay = start - buffer[0].start + self.gap.value
+        for message in buffer:
             message.start += delay
-            yield message
-        self.buffer = []
+        return buffer
 
 
 def clip_pitch(pitch: int) -> int:
-    while pitch >= 127:
-        pitch -= 12
-    while pitch < 0:
-        pitch += 12
+    """Shift pitch by whole octaves until it is in [0, 127), i.e. into [115, 127) from above
+    or into [0, 12) from below
+    """
+    if pitch >= 127:
+        return pitch - 12 * ((pitch - 115) // 12)
+    if pitch < 0:
+        return pitch % 12
     return pitch
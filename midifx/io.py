@@ -1,23 +1,29 @@
 import asyncio
+import copy
 import dataclasses
 import logging
 import os
-from asyncio import PriorityQueue
 from datetime import datetime
-from collections import defaultdict
+from itertools import groupby
+from operator import attrgetter
 from time import time, sleep
 from typing import Iterable, List, Optional, Set
 
+import numpy as np
 import pretty_midi
 from rtmidi import MidiIn, MidiOut
 
+try:
+    import uvloop
+except ImportError:  # optional, install with `pip install midifx[uvloop]`
+    uvloop = None
+
 from midifx.constants import MAX_QUEUE_SIZE, PROGRAMS
-from midifx.core import Module
+from midifx.core import Module, TimedHeap
 from midifx.note import ControlChange, Message, NoteParser, Note
 
 PADDING = 0.05  # between start_message <-> notes and notes <-> end_message
-
-MIDI_LOGS: List[Message] = []
+CHANNEL_MESSAGES = (Note, ControlChange)  # message types with a `channel` field
 
 
 class StopChain(Exception):
@@ -38,11 +44,13 @@ class Chain:
         connect_modules(*self.modules)
         if self.loop:
             connect_modules(self.modules[-1], self.modules[0])
+        fuse_modules(*self.modules)
 
     def run(self, restart_on_interrupt: bool = False) -> None:
         while True:
             try:
-                asyncio.run(self.await_all(), debug=False)
+                run = asyncio.run if uvloop is None else uvloop.run
+                run(self.await_all(), debug=False)
             except (KeyboardInterrupt, StopChain):
                 logging.info("Interrupted...")
                 if self.log_dir:
@@ -62,7 +70,13 @@ class Chain:
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
         path = os.path.join(self.log_dir, timestamp + ".mid")
         logging.info(f"Writing MIDI to {path}")
-        write_midi(path, MIDI_LOGS)  # TODO: should MIDI_LOGS be a more async-friendly object?
+        logs = [
+            message
+            for module in self.modules
+            if isinstance(module, MIDILogger)
+            for message in module.logs
+        ]
+        write_midi(path, logs)
 
 
 class ReceiveMIDI(Module):
@@ -70,7 +84,6 @@ class ReceiveMIDI(Module):
         super().__init__("Receive MIDI")
         self.resolution = resolution
         self.midi_in = find_or_create_midi_in(name)
-        self.bytes_queue = asyncio.PriorityQueue(maxsize=2 * MAX_QUEUE_SIZE)
         self.parser = NoteParser()
         self.tasks = [self.receive_bytes, self.run]
 
@@ -81,7 +94,7 @@ class ReceiveMIDI(Module):
             if midi_in_data:
                 event, _ = midi_in_data
                 messages = self.parser.parse_stream(t, event)
-                logging.debug(f"Received event {event} at t = {t}")
+                logging.debug("Received event %s at t = %s", event, t)
                 await self.send(messages)
             else:
                 await asyncio.sleep(self.resolution)
@@ -97,7 +110,7 @@ class ReadMIDI(Module):
         level: float = 1.0,
     ):
         super().__init__("Read MIDI")
-        self.pretty_midi = pretty_midi.PrettyMIDI(path)
+        self.notes = filter_and_sort_prettymidi(pretty_midi.PrettyMIDI(path))[:max_notes]
         self.start_message = start_message
         self.end_message = end_message
         self.max_notes = max_notes
@@ -105,8 +118,8 @@ class ReadMIDI(Module):
         self.tasks = [self.read_bytes, self.run]
 
     async def read_bytes(self) -> None:
-        notes = notes_from_prettymidi(
-            self.pretty_midi,
+        notes = notes_from_pretty_notes(
+            self.notes,
             t_start=time(),
             end_message=self.end_message,
             start_message=self.start_message,
@@ -123,7 +136,8 @@ class SendMIDI(Module):
         override_channel: Optional[int] = None,
     ):
         super().__init__("Send MIDI")
-        self.bytes_queue = PriorityQueue(maxsize=2 * MAX_QUEUE_SIZE)
+        check_channel(override_channel)
+        self.bytes_queue = TimedHeap(maxsize=2 * MAX_QUEUE_SIZE)
         self.midi_out = find_or_create_midi_out(name)
         self.resolution = resolution
         self.override_channel = override_channel
@@ -132,48 +146,58 @@ class SendMIDI(Module):
     async def run(self) -> None:
         """Poll `input` for message, and convert to MIDI events (bytes)"""
         while True:
-            _, message = await self.input.get()
-            message_copy = dataclasses.replace(message)
-            if self.override_channel is not None:
-                message_copy.channel = self.override_channel
-            for t, event in message_copy.to_bytes():
-                logging.debug(f"Queuing bytes {event} from {message_copy}...")
-                await self.bytes_queue.put((t, event))
-            await super().send([message])  # in case there's other outputs
+            messages = await self.input.get_batch()
+            for message in messages:
+                message_copy = copy.copy(message)
+                if self.override_channel is not None and isinstance(message_copy, CHANNEL_MESSAGES):
+                    message_copy.channel = self.override_channel
+                for t, event in message_copy.to_bytes():
+                    logging.debug("Queuing bytes %s from %s...", event, message_copy)
+                    self.bytes_queue.put_nowait((t, event))
+            await self.bytes_queue.drain()
+            if self.outputs or self.fused:
+                await super().send(messages)  # in case there's other outputs or fused modules
 
     async def send_bytes(self) -> None:
         """Poll `bytes_queue` for events, and send as MIDI"""
         logging.info(f"Running {self.name}/send_bytes...")
         max_late = 0.0
         while True:
-            t, event = await self.bytes_queue.get()
+            if not self.bytes_queue:
+                await self.bytes_queue.wait()
+                continue
+            t, event = self.bytes_queue.peek()
+            delay = t - time()
+            if delay > self.resolution / 2:
+                # sleep until the event is due, unless an earlier event comes in first
+                await self.bytes_queue.wait(timeout=delay)
+                continue
+            self.bytes_queue.pop()
             late = time() - t
-            if late > -self.resolution / 2:
-                log_fn = logging.warning if late > max_late else logging.debug
-                log_fn(f"Sending event {event}, {1000 * late:.1f}ms late")
-                self.midi_out.send_message(event)
-                if late > max_late:
-                    max_late = late
-            else:
-                await self.bytes_queue.put((t, event))
-                await asyncio.sleep(self.resolution)
+            log_fn = logging.warning if late > max_late else logging.debug
+            log_fn("Sending event %s, %.1fms late", event, 1000 * late)
+            self.midi_out.send_message(event)
+            if late > max_late:
+                max_late = late
 
 
 class MIDILogger(Module):
     def __init__(self, override_channel: Optional[int] = None, max_messages: Optional[int] = None):
         super().__init__("MIDILogger")
+        check_channel(override_channel)
         self.override_channel = override_channel
         self.max_messages = max_messages
+        self.logs = []
 
     def process(self, messages: Iterable[Message]) -> Iterable[Message]:
         for message in messages:
-            message_copy = dataclasses.replace(message)
-            if self.override_channel is not None:
+            message_copy = copy.copy(message)
+            if self.override_channel is not None and isinstance(message_copy, CHANNEL_MESSAGES):
                 message_copy.channel = self.override_channel
-            MIDI_LOGS.append(message_copy)
-            if self.max_messages is not None and len(MIDI_LOGS) >= self.max_messages:
+            self.logs.append(message_copy)
+            if self.max_messages is not None and len(self.logs) >= self.max_messages:
                 raise StopChain
-            yield message
+        return messages
 
 
 class SendPulse(Module):
@@ -197,12 +221,15 @@ class SendPulse(Module):
         t = time() + self.ioi
         while True:
             t += self.ioi
-            message = Note(
-                t, pitch=self.pitch, velocity=self.velocity, duration=self.duration, ioi=self.ioi
-            )
+            message = Note(t, pitch=self.pitch, velocity=self.velocity, duration=self.duration)
             await self.send([message])
 
 
+def check_channel(channel: Optional[int]) -> None:
+    if channel is not None and (not isinstance(channel, int) or not (0 <= channel <= 15)):
+        raise ValueError(f"Channel must be an integer in (0, 15) but got {channel}")
+
+
 def connect_modules(*modules: List[Module]):
     prev_module = modules[0]
     for module in modules[1:]:
@@ -210,6 +237,22 @@ def connect_modules(*modules: List[Module]):
         prev_module = module
 
 
+def fuse_modules(*modules: Module) -> None:
+    """Run each module that only does processing, i.e. has no tasks besides `Module.run`,
+    inline in the `send` of the module before it. A chain of effects then takes one task
+    wake-up per message rather than one per effect.
+    """
+    head = modules[0]
+    for module in modules[1:]:
+        is_effect = type(module).run is Module.run and module.tasks == [module.run]
+        if is_effect and head.outputs == [module.input]:
+            head.fused.append(module)
+            head.outputs = module.outputs
+            module.tasks = []
+        else:
+            head = module
+
+
 def notes_from_prettymidi(
     midi_file: pretty_midi.PrettyMIDI,
     t_start: float = 0.0,
@@ -221,27 +264,55 @@ def notes_from_prettymidi(
 ) -> Iterable[Message]:
     """Convert PrettyMidi to list of Notes"""
     notes = filter_and_sort_prettymidi(midi_file)[:max_notes]
+    return notes_from_pretty_notes(
+        notes,
+        t_start=t_start,
+        start_message=start_message,
+        end_message=end_message,
+        all_keys=all_keys,
+        level=level,
+    )
+
+
+def notes_from_pretty_notes(
+    notes: List[pretty_midi.Note],
+    t_start: float = 0.0,
+    start_message: Optional[Message] = None,
+    end_message: Optional[Message] = None,
+    all_keys: bool = False,
+    level: float = 1.0,
+) -> Iterable[Message]:
+    """Convert a list of pretty_midi Notes, as returned by `filter_and_sort_prettymidi`, to
+    list of Notes
+    """
+    starts = np.array([note.start for note in notes], dtype=float)
+    durations = np.array([note.end for note in notes], dtype=float) - starts
+    velocities = (np.array([note.velocity for note in notes], dtype=float) * level).astype(int)
+    times = starts + (t_start + PADDING - (starts[0] if notes else 0.0))
+    t_end = float(np.max(times + durations, initial=t_start))
+    pitches = [note.pitch for note in notes]
+    columns = times.tolist(), pitches, velocities.tolist(), durations.tolist()
     transpositions = range(-6, 6) if all_keys else [0]
     for transpose in transpositions:
         if start_message is not None:
             yield dataclasses.replace(start_message, start=t_start)
-        t_last = t_start
-        t_end = t_start
-        for note in notes:
-            t = t_start + note.start - notes[0].start + PADDING
-            yield Note(
-                start=t,
-                pitch=note.pitch + transpose,
-                velocity=int(note.velocity * level),
-                duration=note.end - note.start,  # use note.duration?
-                ioi=t - t_last,
-            )
-            t_last = t
-            t_end = max(t_end, t + note.duration)
+        for t, pitch, velocity, duration in zip(*columns):
+            yield Note(start=t, pitch=pitch + transpose, velocity=velocity, duration=duration)
         if end_message is not None:
             yield dataclasses.replace(end_message, start=t_end + PADDING)
 
 
+def compute_iois(notes: List[Note], t_start: Optional[float] = None) -> np.ndarray:
+    """Inter-onset intervals of a list of Notes, as a float32 array aligned with `notes`.
+    The first interval is measured from `t_start`, or is zero if `t_start` is None. Note that
+    the `Note.ioi` this replaces started at `PADDING` for notes read from a MIDI file.
+    """
+    starts = np.array([note.start for note in notes], dtype=float)
+    if t_start is None:
+        t_start = starts[0] if notes else 0.0
+    return np.diff(starts, prepend=t_start).astype(np.float32)
+
+
 def filter_and_sort_prettymidi(
     midi_file: pretty_midi.PrettyMIDI,
     programs: Optional[Set[int]] = PROGRAMS,
@@ -254,36 +325,36 @@ def filter_and_sort_prettymidi(
         if programs is None or instrument.program in programs:
             notes.extend(instrument.notes)
     notes = (note for note in notes if note.end >= note.start)
-    return sorted(notes, key=lambda note: (note.start, note.pitch))
+    return sorted(notes, key=attrgetter("start", "pitch"))
 
 
 def write_midi(path: str, messages: Iterable[Message], program: int = 0) -> None:
-    messages = sorted(messages, key=lambda message: message.start)
+    messages = sorted(messages, key=attrgetter("start"))
     try:
         start_time = messages[0].start
     except IndexError:
         logging.info("No events were logged... Skipping writing MIDI file.")
         return
 
-    instruments = defaultdict(lambda: pretty_midi.Instrument(program=program, is_drum=False))
-    for message in messages:
-        match message:
-            case Note(start, pitch, velocity, duration, channel=channel):
-                start -= start_time
+    pm = pretty_midi.PrettyMIDI()
+    messages = [message for message in messages if isinstance(message, (Note, ControlChange))]
+    messages.sort(key=attrgetter("channel"))  # stable, so still sorted by start within channels
+    for _, channel_messages in groupby(messages, key=attrgetter("channel")):
+        notes, control_changes = [], []
+        for message in channel_messages:
+            start = message.start - start_time
+            if isinstance(message, Note):
+                pitch, velocity = message.pitch, message.velocity
                 if pitch >= 127 or velocity > 127:
                     logging.info(f"Note with large pitch/vel value in write_midi: {message}")
-                pretty_note = pretty_midi.Note(velocity, pitch, start, start + duration)
-                instruments[channel].notes.append(pretty_note)
-            case ControlChange(start, number, value, channel):
-                start -= start_time
-                instruments[channel].control_changes.append(
-                    pretty_midi.ControlChange(number, value, start)
-                )
-            case _:
-                continue
-
-    pm = pretty_midi.PrettyMIDI()
-    pm.instruments.extend(instruments.values())
+                notes.append(pretty_midi.Note(velocity, pitch, start, start + message.duration))
+            else:
+                control_change = pretty_midi.ControlChange(message.number, message.value, start)
+                control_changes.append(control_change)
+        instrument = pretty_midi.Instrument(program=program, is_drum=False)
+        instrument.notes.extend(notes)
+        instrument.control_changes.extend(control_changes)
+        pm.instruments.append(instrument)
     try:
         pm.write(path)
     except ValueError as e:
@@ -2,15 +2,22 @@ from __future__ import annotations
 
 import logging
 import math
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import Iterable, Optional, Tuple
+from dataclasses import dataclass, fields
+from typing import Dict, Final, List, Optional, Sequence, Tuple
 
+_log = logging.getLogger(__name__)
 
-NOTE_ON = 9 * 16
-NOTE_OFF = 8 * 16
-CONTROL_CHANGE = 11 * 16
-SYSTEM_MESSAGE = 15 * 16
+NOTE_ON: Final = 9 * 16
+NOTE_OFF: Final = 8 * 16
+CONTROL_CHANGE: Final = 11 * 16
+SYSTEM_MESSAGE: Final = 15 * 16
+
+Event = Tuple[int, int, int]  # MIDI status byte and data bytes
+
+# status bytes by channel
+_NOTE_ON_BY_CHANNEL: Final = tuple(NOTE_ON + channel for channel in range(16))
+_NOTE_OFF_BY_CHANNEL: Final = tuple(NOTE_OFF + channel for channel in range(16))
+_CONTROL_CHANGE_BY_CHANNEL: Final = tuple(CONTROL_CHANGE + channel for channel in range(16))
 
 MAX_PITCH = 144
 MAX_VELOCITY = 128
@@ -20,24 +27,46 @@ DURATION_BPO = 4
 DURATION_BINS = int(DURATION_BPO * math.log2(MAX_DURATION / MIN_DURATION))
 
 
-@dataclass(order=True)
+@dataclass(slots=True)
 class Message:
     """Abstract class for MIDI messages"""
 
     start: float
 
-    def to_bytes(self) -> Iterable[Tuple[float, Tuple[int]]]:
+    def to_bytes(self) -> Tuple[Tuple[float, Event], ...]:
+        """MIDI events for this message, as (time, bytes) pairs"""
         raise NotImplementedError()
 
+    def __copy__(self) -> Message:
+        message = object.__new__(type(self))
+        for name in _field_names(type(self)):
+            object.__setattr__(message, name, getattr(self, name))
+        return message
+
     def __str__(self) -> str:
-        var_str = ", ".join(
-            f"{k}={v % 86400:.3f}" if isinstance(v, float) and v > 0.0 else f"{k}={v}"
-            for k, v in vars(self).items()
-        )
-        return f"{type(self).__name__}({var_str})"
+        var_strs = []
+        for name in _field_names(type(self)):
+            value = getattr(self, name)
+            if isinstance(value, float) and value > 0.0:
+                var_strs.append(f"{name}={value % 86400:.3f}")
+            else:
+                var_strs.append(f"{name}={value}")
+        return f"{type(self).__name__}({', '.join(var_strs)})"
+
+
+_FIELD_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _field_names(cls: type) -> Tuple[str, ...]:
+    """Field names of a `Message` dataclass, computed once per class"""
+    try:
+        return _FIELD_NAMES[cls]
+    except KeyError:
+        names = _FIELD_NAMES[cls] = tuple(field.name for field in fields(cls))
+        return names
 
 
-@dataclass(order=True)
+@dataclass(slots=True)
 class Note(Message):
     """MIDI note. Like a pretty_midi Note but with channel data
 
@@ -53,17 +82,19 @@ class Note(Message):
     pitch: Optional[int] = None
     velocity: Optional[int] = None
     duration: Optional[float] = None
-    ioi: Optional[float] = None
     channel: int = 0
 
-    def to_bytes(self) -> Iterable[Tuple[float, Tuple[int]]]:
-        event_on = NOTE_ON + self.channel, self.pitch, self.velocity
-        event_off = NOTE_OFF + self.channel, self.pitch, self.velocity
-        yield self.start, event_on
-        yield self.start + self.duration, event_off
+    def to_bytes(self) -> Tuple[Tuple[float, Event], ...]:
+        # pitch, velocity and duration are set on any note that is sent, no need to check
+        channel, pitch, velocity = self.channel, self.pitch, self.velocity
+        t_end = self.start + self.duration  # type: ignore[operator]
+        return (  # type: ignore[return-value]
+            (self.start, (_NOTE_ON_BY_CHANNEL[channel], pitch, velocity)),
+            (t_end, (_NOTE_OFF_BY_CHANNEL[channel], pitch, velocity)),
+        )
 
 
-@dataclass(order=True)
+@dataclass(slots=True)
 class ControlChange(Message):
     """Control change message
 
@@ -79,14 +110,22 @@ class ControlChange(Message):
     value: int = 0
     channel: int = 0
 
-    def to_bytes(self) -> Iterable[Tuple[float, Tuple[int]]]:
-        yield self.start, (CONTROL_CHANGE + self.channel, self.number, self.value)
+    def to_bytes(self) -> Tuple[Tuple[float, Event], ...]:
+        event = _CONTROL_CHANGE_BY_CHANNEL[self.channel], self.number, self.value
+        return ((self.start, event),)
 
 
-@dataclass(order=True)
+@dataclass(slots=True)
 class SystemMessage(Message):
+    """System message, e.g. timing clock or active sensing
+
+    Args:
+    - start (float): start time
+    - number (int): low nibble of the status byte, in [0, 16)
+    """
+
     start: float
-    number: float
+    number: int
 
 
 class NoteParser:
@@ -98,52 +137,100 @@ class NoteParser:
     """
 
     def __init__(self) -> None:
-        self.notes_on = defaultdict(dict)  # channel -> pitch -> note
+        self.notes_on: List[Optional[Note]] = [None] * (16 * 128)  # channel << 7 | pitch -> note
+        self.running_status = 0  # last channel status byte, 0 if none
 
-    def parse_stream(self, t: float, byte_stream: Iterable[int]) -> Iterable[Message]:
-        """Convert a timestamp + MIDI bytes to an iterable of `Message`
-        e.g. `Note`, `ControlChange`, `SystemMessage`
+    def parse_stream(self, t: float, data: Sequence[int]) -> List[Message]:
+        """Convert a timestamp + MIDI bytes, e.g. as `bytes` or a list of ints, to a list of
+        `Message` e.g. `Note`, `ControlChange`, `SystemMessage`
         """
 
-        byte_stream = iter(byte_stream)
-        while True:
+        messages: List[Message] = []
+        i, n = 0, len(data)
+        while i < n:
+            status_byte = data[i]
+            if status_byte < 0x80 and self.running_status:
+                # "running status": data bytes for a repeat of the previous channel message
+                status_byte = self.running_status
+            else:
+                i += 1
+                if 0x80 <= status_byte < 0xF0:
+                    self.running_status = status_byte
+                elif 0xF0 <= status_byte < 0xF8:
+                    self.running_status = 0  # cleared by system common (not real-time) messages
+            handler = self._handlers[status_byte >> 4]
             try:
-                status_byte = next(byte_stream)
-                match (status_byte // 16, status_byte % 16):
-                    case (9, channel):
-                        # note on
-                        pitch, velocity = next(byte_stream), next(byte_stream)
-                        note = Note(t, pitch, velocity, channel=channel)
-                        self.notes_on[channel][pitch] = note
-                    case (8, channel):
-                        # note off
-                        pitch, _ = next(byte_stream), next(byte_stream)
-                        try:
-                            note = self.notes_on[channel].pop(pitch)
-                            note.duration = t - note.start
-                            yield note
-                        except KeyError:
-                            logging.warning(f"Note off for pitch {pitch} that isn't on")
-                    case (11, channel):
-                        # control change
-                        number, value = next(byte_stream), next(byte_stream)
-                        yield ControlChange(t, number, value, channel=channel)
-                    case (10 | 14, _):
-                        # other status message with two data bytes
-                        data_bytes = next(byte_stream), next(byte_stream)
-                        logging.warning(
-                            f"Unparsed bytes with number {status_byte} and data {data_bytes}"
-                        )
-                    case (12 | 13, _):
-                        # other status message with one data byte
-                        data_byte = next(byte_stream)
-                        logging.warning(
-                            f"Unparsed bytes with number {status_byte} and data {data_byte}"
-                        )
-                    case (15, number):
-                        # system message
-                        yield SystemMessage(t, number)
-                    case (status_byte, _):
-                        logging.warning(f"Unparsed bytes with number {status_byte}")
-            except StopIteration:
-                break
+                i = handler(self, t, status_byte, data, i, messages)
+            except IndexError:
+                break  # message truncated
+        return messages
+
+    def _note_on(
+        self, t: float, status_byte: int, data: Sequence[int], i: int, messages: List[Message]
+    ) -> int:
+        channel = status_byte & 0x0F
+        pitch, velocity = data[i], data[i + 1]
+        self.notes_on[channel << 7 | pitch & 0x7F] = Note(t, pitch, velocity, channel=channel)
+        return i + 2
+
+    def _note_off(
+        self, t: float, status_byte: int, data: Sequence[int], i: int, messages: List[Message]
+    ) -> int:
+        pitch, _ = data[i], data[i + 1]
+        index = (status_byte & 0x0F) << 7 | pitch & 0x7F
+        note = self.notes_on[index]
+        if note is None:
+            _log.warning("Note off for pitch %s that isn't on", pitch)
+        else:
+            self.notes_on[index] = None
+            note.duration = t - note.start
+            messages.append(note)
+        return i + 2
+
+    def _control_change(
+        self, t: float, status_byte: int, data: Sequence[int], i: int, messages: List[Message]
+    ) -> int:
+        messages.append(ControlChange(t, data[i], data[i + 1], channel=status_byte & 0x0F))
+        return i + 2
+
+    def _system_message(
+        self, t: float, status_byte: int, data: Sequence[int], i: int, messages: List[Message]
+    ) -> int:
+        messages.append(SystemMessage(t, status_byte & 0x0F))
+        return i
+
+    def _two_data_bytes(
+        self, t: float, status_byte: int, data: Sequence[int], i: int, messages: List[Message]
+    ) -> int:
+        # other status message with two data bytes
+        data_bytes = data[i], data[i + 1]
+        _log.warning("Unparsed bytes with number %s and data %s", status_byte, data_bytes)
+        return i + 2
+
+    def _one_data_byte(
+        self, t: float, status_byte: int, data: Sequence[int], i: int, messages: List[Message]
+    ) -> int:
+        # other status message with one data byte
+        data_byte = data[i]
+        _log.warning("Unparsed bytes with number %s and data %s", status_byte, data_byte)
+        return i + 1
+
+    def _no_status(
+        self, t: float, status_byte: int, data: Sequence[int], i: int, messages: List[Message]
+    ) -> int:
+        _log.warning("Unparsed bytes with number %s", status_byte)
+        return i
+
+    # handlers by status byte >> 4: data bytes (0-7), then note off (8), note on (9),
+    # aftertouch (10), control change (11), program change (12), channel pressure (13),
+    # pitch bend (14), system message (15)
+    _handlers = (_no_status,) * 8 + (
+        _note_off,
+        _note_on,
+        _two_data_bytes,
+        _control_change,
+        _one_data_byte,
+        _one_data_byte,
+        _two_data_bytes,
+        _system_message,
+    )
@@ -10,10 +10,12 @@ setup(
     packages=find_packages(),
     python_requires=">=3.10",
     install_requires=[
+        "numpy",
         "pretty-midi>=0.2.9",
         "python-rtmidi>=1.5.5",
     ],
     extras_require={
         "test": ["pytest"],
+        "uvloop": ["uvloop>=0.18"],
     },
 )
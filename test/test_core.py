@@ -0,0 +1,53 @@
+import asyncio
+
+from midifx.core import Module, Parameter, Switch, TimedHeap
+from midifx.effects import PitchShift
+from midifx.note import ControlChange, Note
+
+
+def test_control_change_updates_parameters():
+    module = PitchShift(
+        amount=Parameter(0, control_number=5, minimum=-4, maximum=4),
+        on=Switch(True, control_number=6),
+    )
+    module.control_change(5, 96)
+    module.control_change(6, 0)
+    assert module.amount.value == 2.0
+    assert not module.on.value
+
+    module.amount = Parameter(1)
+    module.control_change(5, 0)
+    assert module.amount.value == 1
+    assert list(module._parameters) == ["on", "amount"]
+
+
+def test_parameters_assigned_before_module_init():
+    class MyEffect(Module):
+        def __init__(self):
+            self.amount = Parameter(0, control_number=5)
+            super().__init__("My effect")
+
+    module = MyEffect()
+    module.control_change(5, 64)
+    assert module.amount.value == 64.0
+    assert list(module._parameters) == ["amount", "on"]
+
+
+def test_timed_heap_wakes_up_for_earlier_events():
+    heap = TimedHeap()
+
+    async def main():
+        heap.put_nowait((10.0, "late"))
+        asyncio.get_running_loop().call_later(0.01, heap.put_nowait, (1.0, "early"))
+        await heap.wait(timeout=5.0)
+        return heap.peek()
+
+    assert asyncio.run(asyncio.wait_for(main(), 1.0)) == (1.0, "early")
+    assert [heap.pop(), heap.pop()] == [(1.0, "early"), (10.0, "late")]
+
+
+def test_receive_applies_control_changes_in_order():
+    module = PitchShift(amount=Parameter(0, control_number=5, minimum=0, maximum=128))
+    messages = [Note(0.0, 60), ControlChange(1.0, 5, 12), Note(2.0, 60)]
+    processed = module.receive(messages)
+    assert [message.pitch for message in processed if isinstance(message, Note)] == [60, 72]
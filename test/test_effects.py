@@ -0,0 +1,23 @@
+from midifx.effects import BufferDelay, clip_pitch
+from midifx.note import ControlChange, Note
+
+
+def test_clip_pitch():
+    assert clip_pitch(60) == 60
+    assert clip_pitch(127) == 115
+    assert clip_pitch(138) == 126
+    assert clip_pitch(139) == 115
+    assert clip_pitch(-1) == 11
+    assert clip_pitch(-12) == 0
+    assert all(0 <= clip_pitch(pitch) < 127 for pitch in range(-300, 300))
+
+
+def test_buffer_delay():
+    end_message = ControlChange(start=None, number=4, value=0)
+    module = BufferDelay(control_message=end_message, gap=0.5)
+    notes = [Note(1.0, 60, 64, 0.5), Note(2.0, 62, 64, 0.5)]
+    assert module.process(notes) == []
+
+    out = module.process([ControlChange(3.0, number=4, value=0)])
+    assert [message.start for message in out] == [3.5, 4.5, 5.5]
+    assert not module.buffer
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from midifx import io
+from midifx.effects import Delay, PitchShift
+from midifx.io import (
+    Chain,
+    MIDILogger,
+    ReceiveMIDI,
+    SendMIDI,
+    SendPulse,
+    StopChain,
+    compute_iois,
+)
+from midifx.note import Note
+
+
+def test_fuse_modules_skips_modules_with_own_tasks(monkeypatch):
+    monkeypatch.setattr(io, "find_or_create_midi_in", lambda name: None)
+    monkeypatch.setattr(io, "find_or_create_midi_out", lambda name: None)
+    receive, shift, send = ReceiveMIDI("in"), PitchShift(), SendMIDI()
+    pulse, delay = SendPulse(), Delay()
+    Chain(receive, shift, send, pulse, delay)
+
+    assert receive.fused == [shift] and shift.tasks == []
+    assert receive.outputs == [send.input]
+    assert send.fused == [] and send.tasks == [send.run, send.send_bytes]
+    assert pulse.fused == [delay] and delay.tasks == []
+    assert pulse.tasks == [pulse.generate, pulse.run]
+
+
+def test_modules_fused_into_send_midi_receive_messages(monkeypatch):
+    monkeypatch.setattr(io, "find_or_create_midi_out", lambda name: None)
+    send, logger = SendMIDI(), MIDILogger()
+    Chain(send, logger)
+    assert send.fused == [logger] and send.outputs == []
+
+    async def main():
+        send.input.put_nowait(Note(1.0, 60, 100, 0.5))
+        task = asyncio.create_task(send.run())
+        while not logger.logs:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(main(), 1.0))
+    assert list(logger.logs) == [Note(1.0, 60, 100, 0.5)]
+
+
+def test_fused_feedback_loop_does_not_wait_for_own_input():
+    shift, delay = PitchShift(amount=12), Delay(delay=1.0)
+    Chain(shift, delay, loop=True)
+    assert shift.fused == [delay] and shift.outputs == [shift.input]
+    shift.input.maxsize = 1  # full after one message, so waiting for it to drain would hang
+
+    async def main():
+        await shift.send(shift.receive([Note(0.0, 60)]))
+        return await shift.input.get_batch()
+
+    assert asyncio.run(asyncio.wait_for(main(), 1.0)) == [Note(1.0, 72)]
+
+
+def test_fused_feedback_loop_yields_to_other_tasks():
+    shift, logger = PitchShift(amount=0), MIDILogger(max_messages=10)
+    Chain(shift, logger, loop=True)
+    assert shift.fused == [logger] and shift.outputs == [shift.input]
+    n_logged = []
+
+    async def count_logs():
+        while True:
+            n_logged.append(len(logger.logs))
+            await asyncio.sleep(0)
+
+    async def main():
+        counter = asyncio.create_task(count_logs())
+        shift.input.put_nowait(Note(0.0, 60))
+        try:
+            await shift.run()
+        finally:
+            counter.cancel()
+
+    with pytest.raises(StopChain):
+        asyncio.run(main())
+    assert set(range(1, 10)) <= set(n_logged)  # other tasks run once per pass through the loop
+
+
+def test_compute_iois():
+    notes = [Note(1.0, 60), Note(1.5, 62), Note(2.25, 64)]
+    assert compute_iois(notes).tolist() == [0.0, 0.5, 0.75]
+    assert compute_iois(notes, t_start=0.0).tolist() == [1.0, 0.5, 0.75]
+    assert compute_iois([]).dtype == "float32"
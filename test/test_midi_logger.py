@@ -1,9 +1,11 @@
 import os
 
 import pretty_midi
+import pytest
 
 from midifx.io import Chain, ReadMIDI, MIDILogger, notes_from_prettymidi
 from midifx.effects import PitchShift
+from midifx.note import ControlChange, Note, SystemMessage
 
 EXAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "scale.mid")
 print(EXAMPLE_FILE)
@@ -24,3 +26,18 @@ def test_read_pitch_shift_write(tmpdir, shift: int = 12):
     ref_notes = notes_from_prettymidi(pretty_midi.PrettyMIDI(EXAMPLE_FILE))
     for ref_note, res_note in zip(ref_notes, res_notes):
         assert res_note.pitch - ref_note.pitch == shift
+
+
+def test_midi_logger_overrides_channel_of_channel_messages_only():
+    logger = MIDILogger(override_channel=1)
+    messages = [Note(1.0, 60), ControlChange(1.5, 7, 64), SystemMessage(2.0, 10)]
+    assert logger.receive(messages) == messages
+    assert [getattr(message, "channel", None) for message in logger.logs] == [1, 1, None]
+    assert messages[0].channel == 0
+
+
+def test_midi_logger_rejects_invalid_channel():
+    with pytest.raises(ValueError):
+        MIDILogger(override_channel=-1)
+    with pytest.raises(ValueError):
+        MIDILogger(override_channel=16)
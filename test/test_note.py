@@ -0,0 +1,45 @@
+from midifx.note import ControlChange, Note, NoteParser, SystemMessage
+
+
+def test_parse_stream():
+    parser = NoteParser()
+    assert parser.parse_stream(1.0, [0x91, 60, 100]) == []
+    assert parser.parse_stream(1.5, [0xB1, 4, 120]) == [ControlChange(1.5, 4, 120, channel=1)]
+    assert parser.parse_stream(2.5, [0x81, 60, 0]) == [
+        Note(1.0, pitch=60, velocity=100, duration=1.5, channel=1)
+    ]
+    assert parser.parse_stream(3.0, [0xF8]) == [SystemMessage(3.0, 8)]
+    assert parser.parse_stream(3.5, bytes([0xB0, 7, 64, 0xB0, 7])) == [ControlChange(3.5, 7, 64)]
+
+
+def test_parse_stream_running_status():
+    parser = NoteParser()
+    assert parser.parse_stream(1.0, [0x90, 60, 100, 64, 90]) == []
+    assert parser.parse_stream(2.0, [0x80, 60, 0, 64, 0]) == [
+        Note(1.0, pitch=60, velocity=100, duration=1.0),
+        Note(1.0, pitch=64, velocity=90, duration=1.0),
+    ]
+    assert parser.parse_stream(2.0, [0xB0, 4, 1, 0xF8, 5, 2]) == [
+        ControlChange(2.0, 4, 1),
+        SystemMessage(2.0, 8),
+        ControlChange(2.0, 5, 2),
+    ]
+
+
+def test_parse_stream_unparsed_bytes(caplog):
+    parser = NoteParser()
+    assert parser.parse_stream(1.0, [0x80, 60, 0, 0xE0, 0, 64, 0xC0, 1]) == []
+    assert len(caplog.records) == 3
+
+
+def test_note_to_bytes():
+    note = Note(1.0, pitch=60, velocity=100, duration=0.5, channel=2)
+    assert note.to_bytes() == ((1.0, (0x92, 60, 100)), (1.5, (0x82, 60, 100)))
+    assert ControlChange(2.0, 4, 127, channel=15).to_bytes() == ((2.0, (0xBF, 4, 127)),)
+
+
+def test_message_str():
+    assert str(Note(1.0, pitch=60, velocity=100, duration=0.5)) == (
+        "Note(start=1.000, pitch=60, velocity=100, duration=0.500, channel=0)"
+    )
+    assert str(ControlChange(None, 4)) == "ControlChange(start=None, number=4, value=0, channel=0)"